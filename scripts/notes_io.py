@@ -0,0 +1,54 @@
+"""Presentation file I/O shared by the notes and transition scripts."""
+
+from __future__ import annotations
+
+import mmap
+import os
+
+
+def parse_file_into(doc, path: str) -> None:
+    """Parse the presentation at path into doc.
+
+    The parser reads from a read-only mapping of the file, so the contents
+    are not first copied into a bytes object. The parser copies what it
+    keeps, so the mapping is closed right after.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            doc.ParseFromString(b"")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+            doc.ParseFromString(view)
+
+
+def write_file(path: str, payload: bytes) -> None:
+    """Replace the file at path with payload atomically.
+
+    The payload is written unbuffered to a sibling temp file, fsynced once
+    and renamed over the target, so a killed process never leaves a
+    half-written .pro behind. The target's permission bits are kept.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        try:
+            view = memoryview(payload)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            if mode is not None:
+                os.fchmod(fd, mode)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
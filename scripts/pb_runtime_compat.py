@@ -8,11 +8,19 @@ python ships an older protobuf package. We override the validator with a
 no-op so we can still parse the messages.
 
 We also provide a helper to ensure the protobuf runtime exists, with a
-best-effort `pip install protobuf` fallback when it is missing.
+best-effort `pip install protobuf` fallback when it is missing. When a
+native (upb or C++) backend is installed it is selected before any
+generated module loads, since the pure-Python one is much slower.
+
+The upb backend ships inside the binary protobuf wheels (4.21 and later)
+on PyPI, so a normal `pip install protobuf` provides it. Only platforms
+without a published wheel fall back to pure Python; the scripts call
+warn_if_pure_python_backend() so that case is visible.
 """
 
 from __future__ import annotations
 
+import importlib.util
 import os
 import subprocess
 import sys
@@ -25,8 +33,52 @@ if DEPS_DIR not in sys.path:
   sys.path.insert(0, DEPS_DIR)
 
 _ENSURED = False
+_IMPLEMENTATION_ENV = 'PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION'
+_NATIVE_BACKENDS = (
+  ('upb', 'google._upb._message'),
+  ('cpp', 'google.protobuf.pyext._message'),
+)
 
 
+def _prefer_native_protobuf_backend() -> None:
+  """Select the upb/C++ protobuf backend when one is installed.
+
+  The backend is fixed when google.protobuf.internal.api_implementation is
+  first imported. If that already happened with the pure-Python backend and
+  no *_pb2 module has been loaded yet, the protobuf modules are dropped so
+  the next import picks up the native one. An explicit setting in the
+  environment always wins.
+  """
+
+  if _IMPLEMENTATION_ENV in os.environ:
+    return
+
+  backend = None
+  for name, module in _NATIVE_BACKENDS:
+    try:
+      if importlib.util.find_spec(module) is not None:
+        backend = name
+        break
+    except Exception:
+      continue
+  if backend is None:
+    return
+  os.environ[_IMPLEMENTATION_ENV] = backend
+
+  api_implementation = sys.modules.get('google.protobuf.internal.api_implementation')
+  if api_implementation is None:
+    return
+  try:
+    if api_implementation.Type() != 'python':  # type: ignore[attr-defined]
+      return
+  except Exception:  # pragma: no cover - defensive
+    return
+  if any(name.endswith('_pb2') for name in sys.modules):
+    return
+  for name in list(sys.modules):
+    if name == 'google.protobuf' or name.startswith('google.protobuf.'):
+      del sys.modules[name]
+
 
 def ensure_protobuf_runtime() -> Tuple[bool, str]:
   """Ensure google.protobuf is importable.
@@ -36,6 +88,7 @@ def ensure_protobuf_runtime() -> Tuple[bool, str]:
   """
 
   global _ENSURED
+  _prefer_native_protobuf_backend()
   if _ENSURED:
     try:
       import google.protobuf  # type: ignore  # noqa: F401
@@ -69,6 +122,7 @@ def ensure_protobuf_runtime() -> Tuple[bool, str]:
     detail = (proc.stdout or '') + (proc.stderr or '')
     return False, detail.strip()
 
+  _prefer_native_protobuf_backend()
   try:
     import google.protobuf  # type: ignore  # noqa: F401
     _ENSURED = True
@@ -78,6 +132,27 @@ def ensure_protobuf_runtime() -> Tuple[bool, str]:
     return False, detail.strip()
 
 
+def protobuf_backend() -> str:
+  """Return the active protobuf implementation: 'upb', 'cpp' or 'python'."""
+
+  try:
+    from google.protobuf.internal import api_implementation  # type: ignore
+    return api_implementation.Type()
+  except Exception:  # pragma: no cover - defensive
+    return 'unknown'
+
+
+def warn_if_pure_python_backend() -> None:
+  """Print a stderr warning when protobuf fell back to its slow pure-Python parser."""
+
+  if protobuf_backend() == 'python':
+    print(
+      'warning: protobuf is running on its pure-Python backend; install a '
+      'protobuf wheel with upb for much faster parsing',
+      file=sys.stderr,
+    )
+
+
 def relax_protobuf_runtime_check() -> None:
   try:
     from google.protobuf import runtime_version as _runtime_version  # type: ignore
@@ -112,6 +112,13 @@ def set_color(color: basicTypes_pb2.Color, red: float, green: float, blue: float
     color.alpha = alpha
 
 
+# Fixed colors are built once and copied in with CopyFrom rather than set
+# field by field on every action.
+_COLOR_BLUE = basicTypes_pb2.Color(red=0.054, green=0.211, blue=0.588, alpha=1.0)
+_COLOR_TRANSPARENT = basicTypes_pb2.Color(red=0.0, green=0.0, blue=0.0, alpha=0.0)
+_COLOR_WHITE = basicTypes_pb2.Color(red=1.0, green=1.0, blue=1.0, alpha=1.0)
+
+
 def parse_color(value: Any, default: tuple[float, float, float, float]) -> tuple[float, float, float, float]:
     if isinstance(value, (list, tuple)) and len(value) == 4:
         try:
@@ -281,7 +288,7 @@ def add_audience_look_action(cue: cue_pb2.Cue, look_name: str) -> None:
     action.isEnabled = True
     action.delay_time = 0.0
     action.label.text = ''
-    set_color(action.label.color, 0.054, 0.211, 0.588, 1.0)
+    action.label.color.CopyFrom(_COLOR_BLUE)
     action.audience_look.identification.parameter_name = look_name
 
 
@@ -302,7 +309,7 @@ def add_stage_layout_action(cue: cue_pb2.Cue, layout_info: Optional[dict[str, An
     action.isEnabled = True
     action.delay_time = 0.0
     action.label.text = ''
-    set_color(action.label.color, 0.054, 0.211, 0.588, 1.0)
+    action.label.color.CopyFrom(_COLOR_BLUE)
 
     for entry in assignments_data:
         if not isinstance(entry, dict):
@@ -385,7 +392,7 @@ def add_background_lights_group(
     clear_props_action.isEnabled = True
     clear_props_action.delay_time = 0.1
     clear_props_action.label.text = ''
-    set_color(clear_props_action.label.color, 0.054, 0.211, 0.588, 1.0)
+    clear_props_action.label.color.CopyFrom(_COLOR_BLUE)
     clear_props_action.clear.target_layer = action_pb2.Action.ClearType.ClearTargetLayer.CLEAR_TARGET_LAYER_PROP
 
     if timer_seconds is not None and math.isfinite(timer_seconds) and timer_seconds > 0:
@@ -398,7 +405,7 @@ def add_background_lights_group(
         timer_action.isEnabled = True
         timer_action.delay_time = 0.0
         timer_action.label.text = ''
-        set_color(timer_action.label.color, 0.054, 0.211, 0.588, 1.0)
+        timer_action.label.color.CopyFrom(_COLOR_BLUE)
         timer_action.timer.action_type = action_pb2.Action.TimerType.TimerAction.ACTION_RESET_AND_START
         timer_action.timer.timer_identification.parameter_name = timer_name
         timer_uuid = ''
@@ -492,7 +499,7 @@ def build_lyric_slide(
     slide = slide_pb2.Slide()
     slide.uuid.string = new_uuid()
     slide.draws_background_color = False
-    set_color(slide.background_color, 0.0, 0.0, 0.0, 0.0)
+    slide.background_color.CopyFrom(_COLOR_TRANSPARENT)
     slide.size.width = 1920.0
     slide.size.height = 1080.0
 
@@ -508,7 +515,7 @@ def build_lyric_slide(
     element.opacity = 1.0
     set_color(element.fill.color, *fill_color)
     element.stroke.width = 3.0
-    set_color(element.stroke.color, 1.0, 1.0, 1.0, 1.0)
+    element.stroke.color.CopyFrom(_COLOR_WHITE)
     element.shadow.angle = 315.0
     element.shadow.offset = 5.0
     element.shadow.radius = 5.0
@@ -807,7 +814,7 @@ def attach_background_media(cue: cue_pb2.Cue, config: Optional[dict[str, Any]])
     action.isEnabled = True
     action.delay_time = 0.0
     action.label.text = ''
-    set_color(action.label.color, 0.054, 0.211, 0.588, 1.0)
+    action.label.color.CopyFrom(_COLOR_BLUE)
 
     if duration_value and math.isfinite(duration_value) and duration_value > 0:
         action.duration = float(duration_value)
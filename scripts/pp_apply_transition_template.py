@@ -1,20 +1,35 @@
 #!/usr/bin/env python3
+import copy
+import functools
+import io
 import json
 import math
 import os
+import shutil
+import struct
 import sys
-import uuid
 import tempfile
+import urllib.parse
 import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Tuple, Optional, Any
 import subprocess
 
+# orjson's decode error subclasses json.JSONDecodeError, so the handlers in
+# main catch either.
+try:
+    from orjson import loads as _loads  # type: ignore
+except ImportError:  # optional speedup
+    from json import loads as _loads
+
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
 
 sys.path.insert(0, os.path.join(PROJECT_ROOT, 'scripts'))
 from pb_runtime_compat import ensure_protobuf_runtime, relax_protobuf_runtime_check  # type: ignore
+from notes_io import write_file  # type: ignore
 
 ensure_protobuf_runtime()
 relax_protobuf_runtime_check()
@@ -37,152 +52,270 @@ LOWER_THIRD_LABEL = "LOWER THIRD"
 LOWER_THIRD_LABEL_COLOR = (0.043118, 0.0, 0.263037, 1.0)
 PHOTO_LABEL_COLOR = (0.23137255, 0.0, 0.4, 1.0)
 
+# Resolved once: media attach helpers compare every path against these.
+_HOME = Path.home()
+_DOCUMENTS = _HOME / 'Documents'
+_HOME_STR = str(_HOME)
+_HOME_PREFIX = _HOME_STR + os.sep
+_DOCUMENTS_PREFIX = str(_DOCUMENTS) + os.sep
+
+# Enum lookups go through several descriptor proxies; bind the ones the cue
+# and media builders use once at import.
+_AT = action_pb2.Action.ActionType
+_SLIDE = _AT.ACTION_TYPE_PRESENTATION_SLIDE
+_TIMER = _AT.ACTION_TYPE_TIMER
+_LOOK = _AT.ACTION_TYPE_AUDIENCE_LOOK
+_STAGE = _AT.ACTION_TYPE_STAGE_LAYOUT
+_MEDIA = _AT.ACTION_TYPE_MEDIA
+_PLAYLIST = _AT.ACTION_TYPE_MEDIA_BIN_PLAYLIST
+_CLEAR = _AT.ACTION_TYPE_CLEAR
+_PROP = _AT.ACTION_TYPE_PROP
+_LAYER_FG = action_pb2.Action.MediaType.LayerType.LAYER_TYPE_FOREGROUND
+_CLEAR_LAYER_PROP = action_pb2.Action.ClearType.ClearTargetLayer.CLEAR_TARGET_LAYER_PROP
+_CLEAR_LAYER_BACKGROUND = action_pb2.Action.ClearType.ClearTargetLayer.CLEAR_TARGET_LAYER_BACKGROUND
+_TIMER_RESET_AND_START = action_pb2.Action.TimerType.TimerAction.ACTION_RESET_AND_START
+_SCALE_FILL = graphicsData_pb2.Media.DrawingProperties.ScaleBehavior.SCALE_BEHAVIOR_FILL
+_SCALE_CENTER = graphicsData_pb2.Media.DrawingProperties.ScaleAlignment.SCALE_ALIGNMENT_MIDDLE_CENTER
+_PLAYBACK_STOP = graphicsData_pb2.Media.TransportProperties.PlaybackBehavior.PLAYBACK_BEHAVIOR_STOP
+_END_FADE_TO_CLEAR = graphicsData_pb2.Media.VideoProperties.EndBehavior.END_BEHAVIOR_FADE_TO_CLEAR
+_PLATFORM_MAC = basicTypes_pb2.URL.Platform.PLATFORM_MACOS
+_ROOT_DOCS = basicTypes_pb2.URL.LocalRelativePath.Root.Value('ROOT_USER_DOCUMENTS')
+_ROOT_HOME = basicTypes_pb2.URL.LocalRelativePath.Root.Value('ROOT_USER_HOME')
+
+
+_SINGLE_BYTE_VARINTS = [bytes((i,)) for i in range(0x80)]
+
+
+_DEBUG = bool(os.environ.get('PP_DEBUG'))
+_log_buf = io.StringIO()
+
+
+def _log(message: str) -> None:
+    # Cue builders log a line or more per cue; collect them and let
+    # _flush_log write them out in one go.
+    _log_buf.write(message + '\n')
+
+
+def _debug(message: str) -> None:
+    if _DEBUG:
+        _log(message)
+
+
+def _flush_log() -> None:
+    text = _log_buf.getvalue()
+    _log_buf.seek(0)
+    _log_buf.truncate()
+    if text:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+def _flushes_log(func: Any) -> Any:
+    # Everything logged during the call, including by a failed build, goes
+    # out in a single write when it returns.
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _flush_log()
+    return wrapper
+
 
 def _encode_varint(value: int) -> bytes:
     if value < 0:
         raise ValueError('Varint encoding expects non-negative values')
-    parts: list[int] = []
-    while True:
-        to_write = value & 0x7F
-        value >>= 7
-        if value:
-            parts.append(to_write | 0x80)
-        else:
-            parts.append(to_write)
-            break
-    return bytes(parts)
+    if value < 0x80:
+        return _SINGLE_BYTE_VARINTS[value]
+    # The byte count is known up front from bit_length, so every 7-bit group
+    # can be emitted in one pass: continuation bit on all but the last.
+    last_shift = 7 * ((value.bit_length() - 1) // 7)
+    return bytes([((value >> shift) & 0x7F) | 0x80 for shift in range(0, last_shift, 7)] + [value >> last_shift])
 
 
-def _inject_varint_field(message: Any, field_number: int, value: int) -> None:
+def _inject_varint_fields(message: Any, fields: list[Tuple[int, int]]) -> None:
+    # MergeFromString only decodes the appended bytes, which land in the
+    # message's unknown fields; the existing contents are never re-serialized.
     try:
-        buffer = bytearray(message.SerializeToString())
-        key = (field_number << 3) | 0  # varint wire type
-        buffer.extend(_encode_varint(key))
-        buffer.extend(_encode_varint(value))
-        message.ParseFromString(bytes(buffer))
+        buffer = bytearray()
+        for field_number, value in fields:
+            buffer.extend(_encode_varint((field_number << 3) | 0))  # varint wire type
+            buffer.extend(_encode_varint(value))
+        message.MergeFromString(bytes(buffer))
     except Exception:
         pass
 
 
+_UUID_BATCH = 64
+_UUID_POOL: list[str] = []
+
+
+def _fill_uuid_pool(count: int) -> None:
+    # One os.urandom call and one hex pass cover the whole batch.
+    raw = bytearray(os.urandom(16 * count))
+    for off in range(0, len(raw), 16):
+        raw[off + 6] = (raw[off + 6] & 0x0F) | 0x40
+        raw[off + 8] = (raw[off + 8] & 0x3F) | 0x80
+    h = raw.hex().upper()
+    _UUID_POOL.extend(
+        f"{h[i:i + 8]}-{h[i + 8:i + 12]}-{h[i + 12:i + 16]}-{h[i + 16:i + 20]}-{h[i + 20:i + 32]}"
+        for i in range(0, len(h), 32)
+    )
+
+
 def new_uuid() -> str:
-    return str(uuid.uuid4()).upper()
+    # Random (version 4) UUID formatted straight to upper case, skipping the
+    # uuid.UUID object and the lower-then-upper string pass. Values come from
+    # a pool refilled in batches rather than one random draw per call.
+    if not _UUID_POOL:
+        _fill_uuid_pool(_UUID_BATCH)
+    return _UUID_POOL.pop()
+
+
+def make_color(red: float, green: float, blue: float, alpha: float = 1.0) -> basicTypes_pb2.Color:
+    return basicTypes_pb2.Color(red=red, green=green, blue=blue, alpha=alpha)
 
 
-def set_color(color: basicTypes_pb2.Color, red: float, green: float, blue: float, alpha: float = 1.0) -> None:
-    color.red = red
-    color.green = green
-    color.blue = blue
-    color.alpha = alpha
+# Every label uses one of a handful of colors; build them once and CopyFrom
+# instead of setting four fields per action.
+_COLOR_TRANSPARENT = make_color(0.0, 0.0, 0.0, 0.0)
+_COLOR_BLACK = make_color(0.0, 0.0, 0.0, 1.0)
+_COLOR_BLUE = make_color(0.054, 0.211, 0.588, 1.0)
+_COLOR_PURPLE = make_color(0.694, 0.231, 1.0, 1.0)  # Purple B13BFF
+_COLOR_LOWER_THIRD = make_color(*LOWER_THIRD_LABEL_COLOR)
+_COLOR_PHOTO = make_color(*PHOTO_LABEL_COLOR)
 
 
 def build_transition_slide() -> presentationSlide_pb2.PresentationSlide:
     slide = slide_pb2.Slide()
     slide.uuid.string = new_uuid()
     slide.draws_background_color = False
-    set_color(slide.background_color, 0.0, 0.0, 0.0, 0.0)
+    slide.background_color.CopyFrom(_COLOR_TRANSPARENT)
     slide.size.width = 1920.0
     slide.size.height = 1080.0
 
     presentation_slide = presentationSlide_pb2.PresentationSlide()
     presentation_slide.base_slide.CopyFrom(slide)
-    presentation_slide.notes.Clear()
-    presentation_slide.template_guidelines.clear()
+    # A fresh slide has no notes or guidelines; only mark notes as present so
+    # the empty message is still written out.
+    presentation_slide.notes.SetInParent()
 
     return presentation_slide
 
 
-def ensure_group(presentation: presentation_pb2.Presentation, cue_uuids: list[str], label: str) -> presentation_pb2.Presentation.CueGroup:
-    presentation.cue_groups.clear()
-    group = presentation.cue_groups.add()
-    group.group.uuid.string = new_uuid()
-    group.group.name = label
-    set_color(group.group.color, 0.054, 0.211, 0.588, 1.0)
-    group.group.hotKey.Clear()
-    group.group.application_group_identifier.string = new_uuid()
-    group.group.application_group_name = label
-    group.cue_identifiers.clear()
-    for cue_uuid in cue_uuids:
-        if not cue_uuid:
-            continue
-        group.cue_identifiers.add().string = cue_uuid
-    return group
-
-
-def ensure_arrangement(presentation: presentation_pb2.Presentation, group_uuid: str) -> None:
-    if presentation.arrangements:
-        for arrangement in presentation.arrangements:
-            arrangement.group_identifiers.clear()
-            arrangement.group_identifiers.add().string = group_uuid
-    else:
-        arrangement = presentation.arrangements.add()
-        arrangement.uuid.string = new_uuid()
-        arrangement.name = "Default"
-        arrangement.group_identifiers.add().string = group_uuid
-
-
-def assign_group_to_slide_actions(cues: list[cue_pb2.Cue], group_uuid: str, group_name: str) -> None:
-    for cue in cues:
-        for action in cue.actions:
-            if action.type == action_pb2.Action.ActionType.ACTION_TYPE_PRESENTATION_SLIDE:
-                action.layer_identification.uuid.string = group_uuid
-                action.layer_identification.name = group_name
+# Every cue's slide is identical apart from its UUID, so cue builders copy this
+# prototype and stamp a fresh UUID rather than rebuilding the slide each time.
+_TRANSITION_SLIDE_PROTO = build_transition_slide()
+_TRANSITION_SLIDE_PROTO.base_slide.ClearField('uuid')
 
 
 def locate_protobuf_payload(path: str) -> Tuple[str, str]:
     abs_path = os.path.abspath(path)
     if os.path.isdir(abs_path):
-        candidates: list[str] = []
-        for root, _, files in os.walk(abs_path):
-            for name in files:
-                if name.lower().endswith('.pro'):
-                    candidates.append(os.path.join(root, name))
-        if not candidates:
-            raise FileNotFoundError(f'No presentation payload found inside {abs_path}')
-        candidates.sort(key=len)
-        return abs_path, candidates[0]
+        # Breadth-first so the shallowest payload wins without descending into
+        # media folders once one is found; scandir avoids a stat per entry.
+        pending = deque([abs_path])
+        while pending:
+            candidates: list[str] = []
+            for _ in range(len(pending)):
+                try:
+                    it = os.scandir(pending.popleft())
+                except OSError:
+                    continue
+                with it as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            if not entry.is_symlink():
+                                pending.append(entry.path)
+                        elif entry.name.lower().endswith('.pro'):
+                            candidates.append(entry.path)
+            if candidates:
+                return abs_path, min(candidates, key=len)
+        raise FileNotFoundError(f'No presentation payload found inside {abs_path}')
     return os.path.dirname(abs_path), abs_path
 
 
-def read_presentation_bytes(file_path: str) -> Tuple[presentation_pb2.Presentation, Optional[str], Optional[list[zipfile.ZipInfo]], Optional[dict[str, bytes]]]:
+def read_presentation_bytes(file_path: str) -> Tuple[presentation_pb2.Presentation, Optional[str], Optional[list[zipfile.ZipInfo]]]:
     with open(file_path, 'rb') as fh:
         header = fh.read(4)
     doc = presentation_pb2.Presentation()
     if header == b'PK\x03\x04':  # zip file
         with zipfile.ZipFile(file_path, 'r') as zf:
-            data_map: dict[str, bytes] = {}
             target_name: Optional[str] = None
-            for info in zf.infolist():
-                data = zf.read(info.filename)
-                data_map[info.filename] = data
-                if info.filename.lower().endswith('.pro'):
-                    test_doc = presentation_pb2.Presentation()
-                    try:
-                        test_doc.ParseFromString(data)
-                        target_name = info.filename
-                        doc.CopyFrom(test_doc)
-                        break
-                    except Exception:
-                        continue
+            # Pick candidates from the central directory so media members are
+            # never read; the shortest name is the top-level payload.
+            candidates = [info for info in zf.infolist() if info.filename.lower().endswith('.pro')]
+            candidates.sort(key=lambda info: len(info.filename))
+            for info in candidates:
+                test_doc = presentation_pb2.Presentation()
+                try:
+                    test_doc.ParseFromString(zf.read(info.filename))
+                    target_name = info.filename
+                    doc.CopyFrom(test_doc)
+                    break
+                except Exception:
+                    continue
             if target_name is None:
                 raise ValueError(f'No presentation payload found inside zip {file_path}')
-            return doc, target_name, zf.infolist(), data_map
+            return doc, target_name, zf.infolist()
     else:
         with open(file_path, 'rb') as fh:
             doc.ParseFromString(fh.read())
-        return doc, None, None, None
+        return doc, None, None
     raise ValueError('Unhandled presentation format')
 
 
-def write_presentation_bytes(file_path: str, doc: presentation_pb2.Presentation, zip_member: Optional[str], infos: Optional[list[zipfile.ZipInfo]], data_map: Optional[dict[str, bytes]]) -> None:
-    if zip_member and infos is not None and data_map is not None:
-        data_map[zip_member] = doc.SerializeToString()
+_ZIP_LOCAL_HEADER_SIZE = 30
+_ZIP_DATA_DESCRIPTOR = 0x08
+
+
+def _copy_zip_member_raw(src_fp: Any, info: zipfile.ZipInfo, new_zip: zipfile.ZipFile) -> None:
+    """Append a member's local header and compressed bytes to new_zip verbatim.
+
+    The CRC and sizes already recorded in the source central directory stay
+    valid, so nothing is decompressed, recompressed or checksummed. Members
+    that use a trailing data descriptor go through ZipFile instead.
+    """
+    src_fp.seek(info.header_offset)
+    header = src_fp.read(_ZIP_LOCAL_HEADER_SIZE)
+    if len(header) != _ZIP_LOCAL_HEADER_SIZE or header[:4] != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f'Bad local header for {info.filename}')
+    name_len, extra_len = struct.unpack('<HH', header[26:30])
+
+    out = new_zip.fp
+    copied = copy.copy(info)
+    copied.header_offset = out.tell()
+    out.write(header)
+    remaining = name_len + extra_len + info.compress_size
+    while remaining:
+        chunk = src_fp.read(min(remaining, 1 << 20))
+        if not chunk:
+            raise zipfile.BadZipFile(f'Truncated data for {info.filename}')
+        out.write(chunk)
+        remaining -= len(chunk)
+
+    new_zip.filelist.append(copied)
+    new_zip.NameToInfo[copied.filename] = copied
+    new_zip.start_dir = out.tell()
+
+
+def write_presentation_bytes(file_path: str, doc: presentation_pb2.Presentation, zip_member: Optional[str], infos: Optional[list[zipfile.ZipInfo]]) -> None:
+    # Serialize once and hand the writers a memoryview so the payload is not
+    # copied again on its way to disk.
+    payload = memoryview(doc.SerializePartialToString())
+    if zip_member and infos is not None:
         with tempfile.NamedTemporaryFile(delete=False) as tmp:
             tmp_path = tmp.name
         try:
-            with zipfile.ZipFile(tmp_path, 'w') as new_zip:
+            # Only the presentation member is rebuilt; everything else is
+            # copied from the original archive instead of held in memory.
+            with open(file_path, 'rb') as src_fp, \
+                    zipfile.ZipFile(src_fp, 'r') as src_zip, \
+                    open(tmp_path, 'wb', buffering=2 * 1024 * 1024) as out, \
+                    zipfile.ZipFile(out, 'w') as new_zip:
                 for info in infos:
-                    data = data_map.get(info.filename)
-                    if data is None:
+                    if info.filename != zip_member and not info.flag_bits & _ZIP_DATA_DESCRIPTOR:
+                        _copy_zip_member_raw(src_fp, info, new_zip)
                         continue
                     new_info = zipfile.ZipInfo(filename=info.filename, date_time=info.date_time)
                     new_info.compress_type = info.compress_type
@@ -193,7 +326,14 @@ def write_presentation_bytes(file_path: str, doc: presentation_pb2.Presentation,
                     new_info.create_version = info.create_version
                     new_info.extract_version = info.extract_version
                     new_info.volume = info.volume
-                    new_zip.writestr(new_info, data)
+                    if info.filename == zip_member:
+                        new_zip.writestr(new_info, payload)
+                    elif info.is_dir():
+                        new_zip.writestr(new_info, b'')
+                    else:
+                        new_info.file_size = info.file_size
+                        with src_zip.open(info) as src, new_zip.open(new_info, 'w') as dst:
+                            shutil.copyfileobj(src, dst, length=1 << 20)
             os.replace(tmp_path, file_path)
         finally:
             if os.path.exists(tmp_path):
@@ -202,8 +342,7 @@ def write_presentation_bytes(file_path: str, doc: presentation_pb2.Presentation,
                 except OSError:
                     pass
     else:
-        with open(file_path, 'wb') as fh:
-            fh.write(doc.SerializeToString())
+        write_file(file_path, payload)
 
 
 def add_audience_look_action(cue: cue_pb2.Cue, look_name: str) -> None:
@@ -214,11 +353,11 @@ def add_audience_look_action(cue: cue_pb2.Cue, look_name: str) -> None:
     action = cue.actions.add()
     action.uuid.string = new_uuid()
     action.name = f"Audience Look • {look_name}"
-    action.type = action_pb2.Action.ActionType.ACTION_TYPE_AUDIENCE_LOOK
+    action.type = _LOOK
     action.isEnabled = True
     action.delay_time = 0.0
     action.label.text = ''
-    set_color(action.label.color, 0.054, 0.211, 0.588, 1.0)
+    action.label.color.CopyFrom(_COLOR_BLUE)
     action.audience_look.identification.parameter_name = look_name
 
 
@@ -235,14 +374,13 @@ def add_countdown_timer_action(cue: cue_pb2.Cue, seconds: Optional[float], timer
     action = cue.actions.add()
     action.uuid.string = new_uuid()
     action.name = f"Countdown {int(round(duration))}s"
-    action.type = action_pb2.Action.ActionType.ACTION_TYPE_TIMER
+    action.type = _TIMER
     action.isEnabled = True
     action.delay_time = 0.0
     action.label.text = ''
-    set_color(action.label.color, 0.054, 0.211, 0.588, 1.0)
-    action.timer.action_type = action_pb2.Action.TimerType.TimerAction.ACTION_RESET_AND_START
+    action.label.color.CopyFrom(_COLOR_BLUE)
+    action.timer.action_type = _TIMER_RESET_AND_START
     timer_cfg = action.timer.timer_configuration
-    timer_cfg.Clear()
     timer_name = ''
     timer_uuid = ''
     allows_overrun: Optional[bool] = None
@@ -277,11 +415,11 @@ def add_stage_layout_action(cue: cue_pb2.Cue, layout_info: Optional[dict[str, An
     action = cue.actions.add()
     action.uuid.string = new_uuid()
     action.name = layout_name or 'Stage Layout'
-    action.type = action_pb2.Action.ActionType.ACTION_TYPE_STAGE_LAYOUT
+    action.type = _STAGE
     action.isEnabled = True
     action.delay_time = 0.0
     action.label.text = ''
-    set_color(action.label.color, 0.054, 0.211, 0.588, 1.0)
+    action.label.color.CopyFrom(_COLOR_BLUE)
 
     for entry in assignments_data:
         if not isinstance(entry, dict):
@@ -307,87 +445,116 @@ def add_media_file_action(cue: cue_pb2.Cue, media_info: Optional[dict[str, Any]]
     if not isinstance(raw_path, str) or not raw_path.strip():
         return False
 
-    abs_path = os.path.abspath(os.path.expanduser(raw_path.strip()))
-    if not os.path.exists(abs_path):
-        print(f"transition_media_warning:missing_file:{abs_path}", flush=True)
+    abs_path = _normalize_path(raw_path)
+    try:
+        st = os.stat(abs_path)
+    except OSError:
+        _log(f"transition_media_warning:missing_file:{abs_path}")
         return False
 
     file_name = os.path.basename(abs_path)
-    print(f"transition_media_attach:{file_name}:{abs_path}", flush=True)
+    _log(f"transition_media_attach:{file_name}:{abs_path}")
+
+    action = _add_media_action(cue, file_name, _COLOR_BLUE)
+    media_action = action.media
+    element = media_action.element
+    width, height = _populate_media_element(element, abs_path, media_info, st.st_mtime_ns)
+
+    image_props = element.image
+    _fill_media_drawing(image_props.drawing, width, height)
+
+    if hasattr(image_props, 'file'):
+        image_props.file.local_url.CopyFrom(element.url)
 
+    media_action.audio.SetInParent()
+
+    return True
+
+
+def _add_media_action(cue: cue_pb2.Cue, name: str, label_color: basicTypes_pb2.Color) -> action_pb2.Action:
     action = cue.actions.add()
     action.uuid.string = new_uuid()
-    action.name = file_name
-    action.label.text = file_name
-    set_color(action.label.color, 0.054, 0.211, 0.588, 1.0)
-    action.type = action_pb2.Action.ActionType.ACTION_TYPE_MEDIA
+    action.name = name
+    action.label.text = name
+    action.label.color.CopyFrom(label_color)
+    action.type = _MEDIA
     action.isEnabled = True
     action.delay_time = 0.0
+    action.media.layer_type = _LAYER_FG
+    return action
 
-    media_action = action.media
-    media_action.layer_type = action_pb2.Action.MediaType.LayerType.LAYER_TYPE_FOREGROUND
 
-    element = media_action.element
+def _populate_media_element(element: graphicsData_pb2.Media, abs_path: str, media_info: dict[str, Any], mtime_ns: int) -> Tuple[float, float]:
+    """Fill the element's UUID, format and URL; return its natural size."""
     element.uuid.string = new_uuid()
 
     format_hint = str(media_info.get('formatHint') or '').strip().upper()
     if not format_hint:
-        _, ext = os.path.splitext(file_name)
+        _, ext = os.path.splitext(abs_path)
         format_hint = ext.lstrip('.').upper()
     if format_hint:
         element.metadata.format = format_hint
 
-    absolute_uri = Path(abs_path).resolve().as_uri()
-    element.url.absolute_string = absolute_uri
-    element.url.platform = basicTypes_pb2.URL.Platform.PLATFORM_MACOS
+    # abs_path is already absolute, so quote it directly rather than paying for
+    # Path.resolve()'s per-component symlink walk just to build the URI.
+    element.url.absolute_string = 'file://' + urllib.parse.quote(abs_path)
+    element.url.platform = _PLATFORM_MAC
 
-    documents_root = Path.home() / 'Documents'
     rel_path = media_info.get('documentsRelativePath') if isinstance(media_info.get('documentsRelativePath'), str) else None
     if rel_path:
         rel_path = rel_path.strip().lstrip('/')
-    if not rel_path and str(Path(abs_path).resolve()).startswith(str(documents_root) + os.sep):
-        rel_path = os.path.relpath(abs_path, documents_root).replace(os.sep, '/')
+    if not rel_path:
+        # Only canonicalise when the caller did not supply the relative path.
+        resolved = os.path.realpath(abs_path)
+        if resolved.startswith(_DOCUMENTS_PREFIX):
+            rel_path = resolved[len(_DOCUMENTS_PREFIX):].replace(os.sep, '/')
 
     if rel_path:
-        element.url.local.root = basicTypes_pb2.URL.LocalRelativePath.Root.Value('ROOT_USER_DOCUMENTS')
+        element.url.local.root = _ROOT_DOCS
         element.url.local.path = rel_path
     else:
-        element.url.local.root = basicTypes_pb2.URL.LocalRelativePath.Root.Value('ROOT_USER_HOME')
-        element.url.local.path = os.path.relpath(abs_path, Path.home()).replace(os.sep, '/')
+        element.url.local.root = _ROOT_HOME
+        element.url.local.path = _home_relative_path(abs_path)
 
-    width, height = _infer_media_dimensions(abs_path)
+    width, height = _infer_media_dimensions(abs_path, mtime_ns)
+    return float(width), float(height)
 
-    image_props = element.image
-    drawing = image_props.drawing
-    drawing.scale_behavior = graphicsData_pb2.Media.DrawingProperties.ScaleBehavior.SCALE_BEHAVIOR_FILL
-    drawing.scale_alignment = graphicsData_pb2.Media.DrawingProperties.ScaleAlignment.SCALE_ALIGNMENT_MIDDLE_CENTER
-    drawing.natural_size.width = float(width)
-    drawing.natural_size.height = float(height)
+
+def _fill_media_drawing(drawing: graphicsData_pb2.Media.DrawingProperties, width: float, height: float) -> None:
+    drawing.scale_behavior = _SCALE_FILL
+    drawing.scale_alignment = _SCALE_CENTER
+    drawing.natural_size.width = width
+    drawing.natural_size.height = height
     drawing.custom_image_bounds.origin.x = 0.0
     drawing.custom_image_bounds.origin.y = 0.0
-    drawing.custom_image_bounds.size.width = float(width)
-    drawing.custom_image_bounds.size.height = float(height)
+    drawing.custom_image_bounds.size.width = width
+    drawing.custom_image_bounds.size.height = height
     drawing.crop_enable = False
     drawing.crop_insets.top = 0.0
     drawing.crop_insets.bottom = 0.0
     drawing.crop_insets.left = 0.0
     drawing.crop_insets.right = 0.0
 
-    if hasattr(image_props, 'file'):
-        file_props = image_props.file
-        local_url = file_props.local_url
-        local_url.absolute_string = absolute_uri
-        local_url.platform = basicTypes_pb2.URL.Platform.PLATFORM_MACOS
-        if rel_path:
-            local_url.local.root = basicTypes_pb2.URL.LocalRelativePath.Root.Value('ROOT_USER_DOCUMENTS')
-            local_url.local.path = rel_path
-        else:
-            local_url.local.root = basicTypes_pb2.URL.LocalRelativePath.Root.Value('ROOT_USER_HOME')
-            local_url.local.path = os.path.relpath(abs_path, Path.home()).replace(os.sep, '/')
 
-    media_action.audio.SetInParent()
+def _normalize_path(raw_path: str, cwd: Optional[str] = None) -> str:
+    # String-only abspath(expanduser(...)) for the '~/...', absolute and
+    # relative forms. Loops pass cwd in so it is looked up once, not per path.
+    path = raw_path.strip()
+    if path == '~' or path.startswith('~' + os.sep):
+        path = _HOME_STR + path[1:]
+    elif path.startswith('~'):
+        path = os.path.expanduser(path)
+    if not os.path.isabs(path):
+        path = os.path.join(cwd if cwd is not None else os.getcwd(), path)
+    return os.path.normpath(path)
 
-    return True
+
+def _home_relative_path(abs_path: str) -> str:
+    # Both sides are already absolute and normalised, so stripping the prefix
+    # gives the same answer as os.path.relpath for anything under home.
+    if abs_path.startswith(_HOME_PREFIX):
+        return abs_path[len(_HOME_PREFIX):].replace(os.sep, '/')
+    return os.path.relpath(abs_path, _HOME_STR).replace(os.sep, '/')
 
 
 def _is_video_file(path: str) -> bool:
@@ -401,80 +568,26 @@ def add_lower_third_media_action(cue: cue_pb2.Cue, media_info: Optional[dict[str
 
     raw_path = media_info.get('filePath') or media_info.get('path') or media_info.get('absolutePath')
     if not isinstance(raw_path, str) or not raw_path.strip():
-        print("transition_lower_third_warning:missing_path", flush=True)
+        _log("transition_lower_third_warning:missing_path")
         return False
 
-    abs_path = os.path.abspath(os.path.expanduser(raw_path.strip()))
-    if not os.path.exists(abs_path):
-        print(f"transition_lower_third_warning:missing_file:{abs_path}", flush=True)
+    abs_path = _normalize_path(raw_path)
+    try:
+        st = os.stat(abs_path)
+    except OSError:
+        _log(f"transition_lower_third_warning:missing_file:{abs_path}")
         return False
 
     if not _is_video_file(abs_path):
         # Fallback to generic attachment for non-video assets
         return add_media_file_action(cue, media_info)
 
-    file_name = os.path.basename(abs_path)
-    action = cue.actions.add()
-    action.uuid.string = new_uuid()
-    action.name = LOWER_THIRD_LABEL
-    action.label.text = LOWER_THIRD_LABEL
-    set_color(action.label.color, *LOWER_THIRD_LABEL_COLOR)
-    action.type = action_pb2.Action.ActionType.ACTION_TYPE_MEDIA
-    action.isEnabled = True
-    action.delay_time = 0.0
-
-    media_action = action.media
-    media_action.layer_type = action_pb2.Action.MediaType.LayerType.LAYER_TYPE_FOREGROUND
-
-    element = media_action.element
-    element.uuid.string = new_uuid()
-
-    format_hint = str(media_info.get('formatHint') or '').strip().upper()
-    if not format_hint:
-        _, ext = os.path.splitext(file_name)
-        format_hint = ext.lstrip('.').upper()
-    if format_hint:
-        element.metadata.format = format_hint
-
-    absolute_uri = Path(abs_path).resolve().as_uri()
-    element.url.absolute_string = absolute_uri
-    element.url.platform = basicTypes_pb2.URL.Platform.PLATFORM_MACOS
-
-    documents_root = Path.home() / 'Documents'
-    rel_path = media_info.get('documentsRelativePath') if isinstance(media_info.get('documentsRelativePath'), str) else None
-    if rel_path:
-        rel_path = rel_path.strip().lstrip('/')
-    abs_resolved = Path(abs_path).resolve()
-    if not rel_path:
-        documents_prefix = str(documents_root) + os.sep
-        abs_str = str(abs_resolved)
-        if abs_str.startswith(documents_prefix):
-            rel_path = os.path.relpath(abs_str, documents_root).replace(os.sep, '/')
-
-    if rel_path:
-        element.url.local.root = basicTypes_pb2.URL.LocalRelativePath.Root.Value('ROOT_USER_DOCUMENTS')
-        element.url.local.path = rel_path
-    else:
-        element.url.local.root = basicTypes_pb2.URL.LocalRelativePath.Root.Value('ROOT_USER_HOME')
-        element.url.local.path = os.path.relpath(abs_path, Path.home()).replace(os.sep, '/')
-
-    width, height = _infer_media_dimensions(abs_path)
+    action = _add_media_action(cue, LOWER_THIRD_LABEL, _COLOR_LOWER_THIRD)
+    element = action.media.element
+    width, height = _populate_media_element(element, abs_path, media_info, st.st_mtime_ns)
 
     video_props = element.video
-    drawing = video_props.drawing
-    drawing.scale_behavior = graphicsData_pb2.Media.DrawingProperties.ScaleBehavior.SCALE_BEHAVIOR_FILL
-    drawing.scale_alignment = graphicsData_pb2.Media.DrawingProperties.ScaleAlignment.SCALE_ALIGNMENT_MIDDLE_CENTER
-    drawing.natural_size.width = float(width)
-    drawing.natural_size.height = float(height)
-    drawing.custom_image_bounds.origin.x = 0.0
-    drawing.custom_image_bounds.origin.y = 0.0
-    drawing.custom_image_bounds.size.width = float(width)
-    drawing.custom_image_bounds.size.height = float(height)
-    drawing.crop_enable = False
-    drawing.crop_insets.top = 0.0
-    drawing.crop_insets.bottom = 0.0
-    drawing.crop_insets.left = 0.0
-    drawing.crop_insets.right = 0.0
+    _fill_media_drawing(video_props.drawing, width, height)
 
     video_props.audio.volume = 1.0
 
@@ -482,11 +595,11 @@ def add_lower_third_media_action(cue: cue_pb2.Cue, media_info: Optional[dict[str
     transport.play_rate = 1.0
     transport.should_fade_in = True
     transport.should_fade_out = True
-    transport.playback_behavior = graphicsData_pb2.Media.TransportProperties.PlaybackBehavior.PLAYBACK_BEHAVIOR_STOP
+    transport.playback_behavior = _PLAYBACK_STOP
     transport.times_to_loop = 1
 
     playback = video_props.video
-    playback.end_behavior = graphicsData_pb2.Media.VideoProperties.EndBehavior.END_BEHAVIOR_FADE_TO_CLEAR
+    playback.end_behavior = _END_FADE_TO_CLEAR
 
     return True
 
@@ -507,11 +620,11 @@ def add_media_playlist_action(cue: cue_pb2.Cue, topic: str, media_info: Optional
     action = cue.actions.add()
     action.uuid.string = new_uuid()
     action.name = media_name
-    action.type = action_pb2.Action.ActionType.ACTION_TYPE_MEDIA_BIN_PLAYLIST
+    action.type = _PLAYLIST
     action.isEnabled = True
     action.delay_time = 0.0
     action.label.text = ''
-    set_color(action.label.color, 0.054, 0.211, 0.588, 1.0)
+    action.label.color.CopyFrom(_COLOR_BLUE)
     action.layer_identification.uuid.string = new_uuid()
     action.layer_identification.name = 'Media'
 
@@ -522,44 +635,60 @@ def add_media_playlist_action(cue: cue_pb2.Cue, topic: str, media_info: Optional
     action.playlist_item.item_uuid.string = media_uuid
     action.playlist_item.item_name = media_name
 
+    # Every value is already a str (or a finite float), so quote the fields
+    # individually instead of serializing a throwaway dict.
     score_val = media_info.get('score')
-    try:
-        payload = {'topic': topic, 'media': media_name, 'uuid': media_uuid}
-        if isinstance(score_val, (int, float)) and math.isfinite(float(score_val)):
-            payload['score'] = round(float(score_val), 3)
-        print(f"transition_topic_media:{json.dumps(payload)}", flush=True)
-    except Exception:
-        print(f"transition_topic_media:topic={topic} media={media_name}", flush=True)
+    score_text = ''
+    if isinstance(score_val, (int, float)) and math.isfinite(float(score_val)):
+        score_text = f', "score": {round(float(score_val), 3)!r}'
+    _log(
+        f'transition_topic_media:{{"topic": {json.dumps(topic)}, "media": {json.dumps(media_name)}, '
+        f'"uuid": {json.dumps(media_uuid)}{score_text}}}'
+    )
+
+
+def _slide_action(name: str, label_text: str, label_color: basicTypes_pb2.Color) -> action_pb2.Action:
+    # Keyword construction fills the whole action in one call instead of a
+    # chain of per-field attribute assignments.
+    action = action_pb2.Action(
+        uuid=basicTypes_pb2.UUID(string=new_uuid()),
+        name=name,
+        type=_SLIDE,
+        isEnabled=True,
+        delay_time=0.0,
+        label=action_pb2.Action.Label(text=label_text, color=label_color),
+        layer_identification=action_pb2.Action.LayerIdentification(
+            uuid=basicTypes_pb2.UUID(string="slides"),  # Fixed ID for slide layer
+            name="Slides",
+        ),
+        slide=action_pb2.Action.SlideType(presentation=_TRANSITION_SLIDE_PROTO),
+    )
+    action.slide.presentation.base_slide.uuid.string = new_uuid()
+    return action
+
+
+def _clear_action(name: str, target_layer: int) -> action_pb2.Action:
+    return action_pb2.Action(
+        uuid=basicTypes_pb2.UUID(string=new_uuid()),
+        name=name,
+        type=_CLEAR,
+        isEnabled=True,
+        delay_time=0.0,
+        label=action_pb2.Action.Label(text='', color=_COLOR_BLUE),
+        clear=action_pb2.Action.ClearType(target_layer=target_layer),
+    )
 
 
 def build_topic_cue(topic: str, media_info: Optional[dict[str, Any]]) -> cue_pb2.Cue:
-    cue = cue_pb2.Cue()
-    cue.uuid.string = new_uuid()
-    cue.name = topic
-    cue.isEnabled = True
-
-    slide_action = cue.actions.add()
-    slide_action.uuid.string = new_uuid()
-    slide_action.name = topic
-    slide_action.type = action_pb2.Action.ActionType.ACTION_TYPE_PRESENTATION_SLIDE
-    slide_action.isEnabled = True
-    slide_action.delay_time = 0.0
-    slide_action.label.text = topic
-    set_color(slide_action.label.color, 0.694, 0.231, 1.0, 1.0)  # Purple B13BFF
-    slide_action.layer_identification.uuid.string = "slides"  # Fixed ID for slide layer
-    slide_action.layer_identification.name = "Slides"
-    slide_action.slide.presentation.CopyFrom(build_transition_slide())
-
-    # Add clear props action
-    clear_props_action = cue.actions.add()
-    clear_props_action.uuid.string = new_uuid()
-    clear_props_action.name = "Clear Props"
-    clear_props_action.type = action_pb2.Action.ActionType.ACTION_TYPE_CLEAR
-    clear_props_action.isEnabled = True
-    clear_props_action.delay_time = 0.0
-    clear_props_action.label.text = ''
-    set_color(clear_props_action.label.color, 0.054, 0.211, 0.588, 1.0)
-    clear_props_action.clear.target_layer = action_pb2.Action.ClearType.ClearTargetLayer.CLEAR_TARGET_LAYER_PROP
+    cue = cue_pb2.Cue(
+        uuid=basicTypes_pb2.UUID(string=new_uuid()),
+        name=topic,
+        isEnabled=True,
+        actions=[
+            _slide_action(topic, topic, _COLOR_PURPLE),
+            _clear_action("Clear Props", _CLEAR_LAYER_PROP),
+        ],
+    )
 
     attached_media = add_media_file_action(cue, media_info)
     if not attached_media:
@@ -575,47 +704,29 @@ def build_photo_cue(topic: str, media_info: Optional[dict[str, Any]], index: int
     label = f"{topic} Photo {index + 1}" if index >= 0 else f"{topic} Photo"
     display_label = f"PHOTO {index + 1}" if index >= 0 else "PHOTO"
 
-    cue = cue_pb2.Cue()
-    cue.uuid.string = new_uuid()
-    cue.name = label
-    cue.isEnabled = True
-
-    slide_action = cue.actions.add()
-    slide_action.uuid.string = new_uuid()
-    slide_action.name = label
-    slide_action.type = action_pb2.Action.ActionType.ACTION_TYPE_PRESENTATION_SLIDE
-    slide_action.isEnabled = True
-    slide_action.delay_time = 0.0
-    slide_action.label.text = display_label
-    set_color(slide_action.label.color, *PHOTO_LABEL_COLOR)
-    slide_action.layer_identification.uuid.string = "slides"
-    slide_action.layer_identification.name = "Slides"
-    slide_action.slide.presentation.CopyFrom(build_transition_slide())
-
-    clear_props_action = cue.actions.add()
-    clear_props_action.uuid.string = new_uuid()
-    clear_props_action.name = "Clear Props"
-    clear_props_action.type = action_pb2.Action.ActionType.ACTION_TYPE_CLEAR
-    clear_props_action.isEnabled = True
-    clear_props_action.delay_time = 0.0
-    clear_props_action.label.text = ''
-    set_color(clear_props_action.label.color, 0.054, 0.211, 0.588, 1.0)
-    clear_props_action.clear.target_layer = action_pb2.Action.ClearType.ClearTargetLayer.CLEAR_TARGET_LAYER_PROP
+    cue = cue_pb2.Cue(
+        uuid=basicTypes_pb2.UUID(string=new_uuid()),
+        name=label,
+        isEnabled=True,
+        actions=[
+            _slide_action(label, display_label, _COLOR_PHOTO),
+            _clear_action("Clear Props", _CLEAR_LAYER_PROP),
+        ],
+    )
 
     attached = add_media_file_action(cue, media_info)
     if not attached:
-        print(f"transition_photo_warning:attach_failed:{label}", flush=True)
+        _log(f"transition_photo_warning:attach_failed:{label}")
         return None
 
     try:
         media_action = cue.actions[-1]
-        if media_action.type == action_pb2.Action.ActionType.ACTION_TYPE_MEDIA:
-            set_color(media_action.label.color, 0.054, 0.211, 0.588, 1.0)
+        if media_action.type == _MEDIA:
+            media_action.label.color.CopyFrom(_COLOR_BLUE)
             drawing = media_action.media.element.image.drawing
             drawing.custom_image_aspect_locked = True
-            drawing.scale_behavior = graphicsData_pb2.Media.DrawingProperties.ScaleBehavior.SCALE_BEHAVIOR_FILL
-            _inject_varint_field(drawing, 15, 1)
-            _inject_varint_field(drawing, 16, 1)
+            drawing.scale_behavior = _SCALE_FILL
+            _inject_varint_fields(drawing, [(15, 1), (16, 1)])
     except Exception:
         pass
 
@@ -639,105 +750,182 @@ def build_lower_third_cue(lower_info: Optional[dict[str, Any]]) -> Optional[cue_
 
     raw_path = lower_info.get('filePath') or lower_info.get('path') or lower_info.get('absolutePath')
     if not isinstance(raw_path, str) or not raw_path.strip():
-        print("transition_lower_third_warning:missing_path", flush=True)
+        _log("transition_lower_third_warning:missing_path")
         return None
 
-    cue = cue_pb2.Cue()
-    cue.uuid.string = new_uuid()
-    cue.name = LOWER_THIRD_LABEL
-    cue.isEnabled = True
-
-    slide_action = cue.actions.add()
-    slide_action.uuid.string = new_uuid()
-    slide_action.name = LOWER_THIRD_LABEL
-    slide_action.type = action_pb2.Action.ActionType.ACTION_TYPE_PRESENTATION_SLIDE
-    slide_action.isEnabled = True
-    slide_action.delay_time = 0.0
-    slide_action.label.text = LOWER_THIRD_LABEL
-    set_color(slide_action.label.color, *LOWER_THIRD_LABEL_COLOR)
-    slide_action.layer_identification.uuid.string = "slides"
-    slide_action.layer_identification.name = "Slides"
-    slide_action.slide.presentation.CopyFrom(build_transition_slide())
+    cue = cue_pb2.Cue(
+        uuid=basicTypes_pb2.UUID(string=new_uuid()),
+        name=LOWER_THIRD_LABEL,
+        isEnabled=True,
+        actions=[_slide_action(LOWER_THIRD_LABEL, LOWER_THIRD_LABEL, _COLOR_LOWER_THIRD)],
+    )
 
     attached = add_lower_third_media_action(cue, lower_info)
     if not attached:
-        print(f"transition_lower_third_warning:attach_failed:{raw_path}", flush=True)
+        _log(f"transition_lower_third_warning:attach_failed:{raw_path}")
         return None
 
     name_text = str(lower_info.get('name') or '').strip()
-    try:
-        payload = {'name': name_text, 'path': os.path.abspath(os.path.expanduser(raw_path.strip()))}
-        print(f"transition_lower_third:{json.dumps(payload)}", flush=True)
-    except Exception:
-        print(f"transition_lower_third:{name_text}", flush=True)
+    lower_path = _normalize_path(raw_path)
+    _log(f'transition_lower_third:{{"name": {json.dumps(name_text)}, "path": {json.dumps(lower_path)}}}')
 
     return cue
 
 
 def build_clear_cue(prop_info: Optional[dict[str, Any]]) -> cue_pb2.Cue:
-    print(f"DEBUG: Starting build_clear_cue with prop_info={prop_info}", flush=True)
-    
-    cue = cue_pb2.Cue()
-    cue.uuid.string = new_uuid()
-    cue.name = CLEAR_LABEL
-    cue.isEnabled = True
-
-    # Add slide action
-    slide_action = cue.actions.add()
-    slide_action.uuid.string = new_uuid()
-    slide_action.name = CLEAR_LABEL
-    slide_action.type = action_pb2.Action.ActionType.ACTION_TYPE_PRESENTATION_SLIDE
-    slide_action.isEnabled = True
-    slide_action.delay_time = 0.0
-    slide_action.label.text = CLEAR_LABEL
-    set_color(slide_action.label.color, 0.0, 0.0, 0.0, 1.0)  # Black color
-    slide_action.layer_identification.uuid.string = "slides"  # Fixed ID for slide layer
-    slide_action.layer_identification.name = "Slides"
-    slide_action.slide.presentation.CopyFrom(build_transition_slide())
-
-    # Add clear action
-    clear_action = cue.actions.add()
-    clear_action.uuid.string = new_uuid()
-    clear_action.name = "Clear"
-    clear_action.type = action_pb2.Action.ActionType.ACTION_TYPE_CLEAR
-    clear_action.isEnabled = True
-    clear_action.delay_time = 0.0
-    clear_action.label.text = ''
-    set_color(clear_action.label.color, 0.054, 0.211, 0.588, 1.0)
-    clear_action.clear.target_layer = action_pb2.Action.ClearType.ClearTargetLayer.CLEAR_TARGET_LAYER_BACKGROUND
+    if _DEBUG:
+        _log(f"DEBUG: Starting build_clear_cue with prop_info={prop_info}")
+
+    cue = cue_pb2.Cue(
+        uuid=basicTypes_pb2.UUID(string=new_uuid()),
+        name=CLEAR_LABEL,
+        isEnabled=True,
+        actions=[
+            _slide_action(CLEAR_LABEL, CLEAR_LABEL, _COLOR_BLACK),
+            _clear_action("Clear", _CLEAR_LAYER_BACKGROUND),
+        ],
+    )
 
     try:
         if prop_info and isinstance(prop_info, dict):
-            print(f"DEBUG: Creating prop action with name={CLEAR_PROP_NAME}", flush=True)
+            _debug(f"DEBUG: Creating prop action with name={CLEAR_PROP_NAME}")
             # Add prop action for Logo
             prop_action = cue.actions.add()
             prop_action.uuid.string = new_uuid()
             prop_action.name = f"Prop • {CLEAR_PROP_NAME}"
-            prop_action.type = action_pb2.Action.ActionType.ACTION_TYPE_PROP
+            prop_action.type = _PROP
             prop_action.isEnabled = True
             prop_action.delay_time = 0.0
             prop_action.label.text = ''
-            set_color(prop_action.label.color, 0.054, 0.211, 0.588, 1.0)
+            prop_action.label.color.CopyFrom(_COLOR_BLUE)
 
             # Set up the prop identification using CollectionElementType
             if 'propUuid' in prop_info:
                 prop_action.prop.identification.parameter_uuid.string = prop_info['propUuid']
-                print(f"DEBUG: Set prop UUID to {prop_info['propUuid']}", flush=True)
+                _debug(f"DEBUG: Set prop UUID to {prop_info['propUuid']}")
             prop_action.prop.identification.parameter_name = CLEAR_PROP_NAME
 
             # Set properties from prop_info
             # The prop flags will be handled by ProPresenter's defaults
             
-            print(f"DEBUG: Successfully added prop action: {prop_action}", flush=True)
+            if _DEBUG:
+                _log(f"DEBUG: Successfully added prop action: {prop_action}")
     except Exception as e:
-        print(f"DEBUG: Error creating prop action: {str(e)}", flush=True)
+        _debug(f"DEBUG: Error creating prop action: {str(e)}")
         # Continue without the prop action rather than failing completely
-        print("DEBUG: Continuing without prop action", flush=True)
+        _debug("DEBUG: Continuing without prop action")
 
     return cue
 
 
-def _infer_media_dimensions(path: str) -> Tuple[float, float]:
+_JPEG_SOF_MARKERS = frozenset({0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF})
+_HEIF_BRANDS = frozenset({b'heic', b'heix', b'hevc', b'hevx', b'heim', b'heis', b'mif1', b'msf1', b'avif'})
+
+
+def _read_jpeg_dims(fh: Any) -> Optional[Tuple[float, float]]:
+    # Walk segment headers only, seeking over each payload until a
+    # start-of-frame marker gives the frame size.
+    fh.seek(2)
+    while True:
+        marker = fh.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        while code == 0xFF:  # fill bytes before the marker code
+            fill = fh.read(1)
+            if not fill:
+                return None
+            code = fill[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:  # standalone markers
+            continue
+        if code in (0xD9, 0xDA):  # end of image / start of scan
+            return None
+        (segment_len,) = struct.unpack('>H', fh.read(2))
+        if code in _JPEG_SOF_MARKERS:
+            _precision, height, width = struct.unpack('>BHH', fh.read(5))
+            return (float(width), float(height)) if width and height else None
+        fh.seek(segment_len - 2, os.SEEK_CUR)
+
+
+def _iter_heif_boxes(fh: Any, start: int, end: Optional[int]):
+    # Yield (type, payload_start, payload_end) for each ISO BMFF box between
+    # start and end (None meaning end of file), seeking over payloads.
+    pos = start
+    while end is None or pos + 8 <= end:
+        fh.seek(pos)
+        header = fh.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header)
+        payload = pos + 8
+        if size == 1:  # 64-bit largesize follows the type
+            large = fh.read(8)
+            if len(large) < 8:
+                return
+            (size,) = struct.unpack('>Q', large)
+            payload += 8
+        elif size == 0:  # box runs to the end of its container
+            size = (end if end is not None else fh.seek(0, os.SEEK_END)) - pos
+        box_end = pos + size
+        if box_end < payload or (end is not None and box_end > end):
+            return
+        yield box_type, payload, box_end
+        pos = box_end
+
+
+def _read_heif_dims(fh: Any) -> Optional[Tuple[float, float]]:
+    # Image sizes live in 'ispe' properties under meta/iprp/ipco. Tiled
+    # images carry one per tile as well as one for the full grid, so keep
+    # the largest.
+    containers = ((b'meta', 4), (b'iprp', 0), (b'ipco', 0))  # meta is a FullBox
+    start, end = 0, None
+    for wanted, skip in containers:
+        for box_type, payload, box_end in _iter_heif_boxes(fh, start, end):
+            if box_type == wanted:
+                start, end = payload + skip, box_end
+                break
+        else:
+            return None
+    best: Optional[Tuple[int, int]] = None
+    for box_type, payload, box_end in _iter_heif_boxes(fh, start, end):
+        if box_type != b'ispe' or box_end - payload < 12:
+            continue
+        fh.seek(payload + 4)  # version and flags
+        width, height = struct.unpack('>II', fh.read(8))
+        if width and height and (best is None or width * height > best[0] * best[1]):
+            best = (width, height)
+    return (float(best[0]), float(best[1])) if best else None
+
+
+def _read_image_dims(path: str) -> Optional[Tuple[float, float]]:
+    """Read pixel dimensions from a PNG, GIF, JPEG or HEIF header.
+
+    Returns None for anything else so the caller can fall back to sips.
+    """
+    try:
+        with open(path, 'rb') as fh:
+            head = fh.read(32)
+            if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+                width, height = struct.unpack('>II', head[16:24])
+            elif head[:6] in (b'GIF87a', b'GIF89a'):
+                width, height = struct.unpack('<HH', head[6:10])
+            elif head[:2] == b'\xff\xd8':
+                return _read_jpeg_dims(fh)
+            elif head[4:8] == b'ftyp' and head[8:12] in _HEIF_BRANDS:
+                return _read_heif_dims(fh)
+            else:
+                return None
+    except (OSError, struct.error):
+        return None
+    return (float(width), float(height)) if width and height else None
+
+
+@functools.lru_cache(maxsize=512)
+def _infer_media_dimensions(path: str, mtime_ns: int) -> Tuple[float, float]:
+    # mtime_ns only keys the cache so an edited file is probed again.
+    header_dims = _read_image_dims(path)
+    if header_dims:
+        return header_dims
     width: Optional[float] = None
     height: Optional[float] = None
     try:
@@ -761,20 +949,58 @@ def _infer_media_dimensions(path: str) -> Tuple[float, float]:
         return 1920.0, 1080.0
     return width, height
 
-def rebuild_transition_presentation(path: str, label: str, audience_look_name: str, timer_seconds: Optional[float], timer_info: Optional[dict[str, Any]], stage_layout_info: Optional[dict[str, Any]], topic_specs: Optional[list[dict[str, Any]]], prop_info: Optional[dict[str, Any]], lower_third_info: Optional[dict[str, Any]]) -> None:
-    print(f"DEBUG: rebuild_transition called with prop_info={prop_info}", flush=True)
+
+def _media_file_path(media_info: Optional[dict[str, Any]]) -> Optional[str]:
+    if not media_info or not isinstance(media_info, dict):
+        return None
+    raw_path = media_info.get('filePath') or media_info.get('path') or media_info.get('absolutePath')
+    if not isinstance(raw_path, str) or not raw_path.strip():
+        return None
+    return _normalize_path(raw_path)
+
+
+def _prefetch_media_dimensions(paths: list[str]) -> None:
+    pending: list[Tuple[str, int]] = []
+    for media_path in dict.fromkeys(paths):
+        try:
+            pending.append((media_path, os.stat(media_path).st_mtime_ns))
+        except OSError:
+            continue
+    if not pending:
+        return
+    # Formats without a header parser still wait on a sips subprocess, so
+    # running probes side by side overlaps those waits. The results land in
+    # _infer_media_dimensions' cache for the cue builders.
+    with ThreadPoolExecutor(max_workers=min(8, len(pending))) as executor:
+        list(executor.map(lambda entry: _infer_media_dimensions(*entry), pending))
+
+
+@_flushes_log
+def rebuild_transition_presentation(path: str, label: str, audience_look_name: str, timer_seconds: Optional[float], timer_info: Optional[dict[str, Any]], stage_layout_info: Optional[dict[str, Any]], topic_specs: Optional[list[dict[str, Any]]], prop_info: Optional[dict[str, Any]], lower_third_info: Optional[dict[str, Any]], doc: Optional[presentation_pb2.Presentation] = None, notes: Optional[str] = None) -> None:
+    if _DEBUG:
+        _log(f"DEBUG: rebuild_transition called with prop_info={prop_info}")
     package_root, target_file = locate_protobuf_payload(path)
 
-    doc, zip_member, infos, data_map = read_presentation_bytes(target_file)
+    # Roughly what one build draws: the base cue and groups plus a handful per
+    # topic. Anything beyond this is refilled lazily.
+    uuids_needed = 16 + 6 * len(topic_specs or ())
+    if len(_UUID_POOL) < uuids_needed:
+        _fill_uuid_pool(uuids_needed - len(_UUID_POOL))
+
+    # A caller that has just parsed a plain (non-zip) payload can hand it over
+    # to skip the re-read; it is edited in place.
+    if doc is None:
+        doc, zip_member, infos = read_presentation_bytes(target_file)
+    else:
+        zip_member, infos = None, None
     first_cue = doc.cues[0] if doc.cues else None
     first_action = first_cue.actions[0] if first_cue and first_cue.actions else None
-    print(
+    _log(
         "transition_template_before:" \
         f"cues={len(doc.cues)}" \
         f", actions={len(first_cue.actions) if first_cue else 0}" \
         f", label={first_action.label.text if first_action else ''}" \
-        f", path={path}",
-        flush=True
+        f", path={path}"
     )
 
     base_cue = cue_pb2.Cue()
@@ -792,19 +1018,20 @@ def rebuild_transition_presentation(path: str, label: str, audience_look_name: s
     base_slide_action = base_cue.actions.add()
     base_slide_action.uuid.string = new_uuid()
     base_slide_action.name = label
-    base_slide_action.type = action_pb2.Action.ActionType.ACTION_TYPE_PRESENTATION_SLIDE
+    base_slide_action.type = _SLIDE
     base_slide_action.isEnabled = True
     base_slide_action.delay_time = 0.0
     base_slide_action.label.text = label
-    set_color(base_slide_action.label.color, 0.694, 0.231, 1.0, 1.0)  # Purple B13BFF
+    base_slide_action.label.color.CopyFrom(_COLOR_PURPLE)
     base_slide_action.layer_identification.uuid.string = "slides"  # Fixed ID for slide layer
     base_slide_action.layer_identification.name = "Slides"
-    base_slide_action.slide.presentation.CopyFrom(build_transition_slide())
+    base_slide_action.slide.presentation.CopyFrom(_TRANSITION_SLIDE_PROTO)
+    base_slide_action.slide.presentation.base_slide.uuid.string = new_uuid()
 
     if timer_info:
-        print(f"transition_timer_info:{json.dumps(timer_info)}", flush=True)
+        _log(f"transition_timer_info:{json.dumps(timer_info)}")
     if stage_layout_info:
-        print(f"transition_stage_layout_info:{json.dumps(stage_layout_info)}", flush=True)
+        _log(f"transition_stage_layout_info:{json.dumps(stage_layout_info)}")
 
     add_audience_look_action(base_cue, audience_look_name)
     add_stage_layout_action(base_cue, stage_layout_info)
@@ -815,23 +1042,24 @@ def rebuild_transition_presentation(path: str, label: str, audience_look_name: s
         prop_action = base_cue.actions.add()
         prop_action.uuid.string = new_uuid()
         prop_action.name = f"Prop • {CLEAR_PROP_NAME}"
-        prop_action.type = action_pb2.Action.ActionType.ACTION_TYPE_PROP
+        prop_action.type = _PROP
         prop_action.isEnabled = True
         prop_action.delay_time = 0.0
         prop_action.label.text = ''
-        set_color(prop_action.label.color, 0.054, 0.211, 0.588, 1.0)
+        prop_action.label.color.CopyFrom(_COLOR_BLUE)
         if 'propUuid' in prop_info:
             prop_action.prop.identification.parameter_uuid.string = prop_info['propUuid']
         prop_action.prop.identification.parameter_name = CLEAR_PROP_NAME
 
     lower_third_cue = build_lower_third_cue(lower_third_info)
     if lower_third_info and lower_third_cue is None:
-        print("transition_lower_third_warning:cue_not_created", flush=True)
+        _log("transition_lower_third_warning:cue_not_created")
     if not lower_third_info:
-        print("transition_lower_third:skip:no_payload", flush=True)
+        _log("transition_lower_third:skip:no_payload")
 
     topic_entries: list[dict[str, Any]] = []
     if topic_specs:
+        cwd = os.getcwd()
         for entry in topic_specs:
             if not isinstance(entry, dict):
                 continue
@@ -843,34 +1071,47 @@ def rebuild_transition_presentation(path: str, label: str, audience_look_name: s
             raw_gallery = entry.get('gallery')
             if isinstance(raw_gallery, list):
                 for photo in raw_gallery:
-                    if not isinstance(photo, dict):
+                    # Gallery entries come from JSON: anything that is not an
+                    # object has no .get, and a non-string path has no .strip,
+                    # so the happy path needs no type checks.
+                    try:
+                        raw_path = (photo.get('filePath') or photo.get('path') or photo.get('absolutePath')).strip()
+                    except AttributeError:
                         continue
-                    raw_path = photo.get('filePath') or photo.get('path') or photo.get('absolutePath')
-                    if not isinstance(raw_path, str) or not raw_path.strip():
+                    if not raw_path:
                         continue
-                    candidate: dict[str, Any] = {'filePath': os.path.abspath(os.path.expanduser(raw_path.strip()))}
+                    candidate: dict[str, Any] = {'filePath': _normalize_path(raw_path, cwd)}
                     for key in ('documentsRelativePath', 'documents_relative_path'):
-                        if isinstance(photo.get(key), str):
-                            candidate['documentsRelativePath'] = photo[key]
+                        value = photo.get(key)
+                        if isinstance(value, str):
+                            candidate['documentsRelativePath'] = value
                             break
-                    if isinstance(photo.get('formatHint'), str):
-                        candidate['formatHint'] = photo['formatHint']
+                    format_hint = photo.get('formatHint')
+                    if isinstance(format_hint, str):
+                        candidate['formatHint'] = format_hint
                     gallery_payload.append(candidate)
             topic_entries.append({'topic': topic_text, 'media': media_info, 'gallery': gallery_payload})
 
     if topic_entries:
-        try:
-            summary = [
-                {
-                    'topic': detail.get('topic'),
-                    'hasMedia': bool(detail.get('media')),
-                    'photoCount': len(detail.get('gallery') or []),
-                }
-                for detail in topic_entries
-            ]
-            print(f"transition_topics:{json.dumps(summary)}", flush=True)
-        except Exception:
-            print(f"transition_topics_count:{len(topic_entries)}", flush=True)
+        # Same JSON as dumping a list of summary dicts; only the topic string
+        # needs escaping, so no dicts are built just to log them.
+        summary = ', '.join(
+            '{"topic": %s, "hasMedia": %s, "photoCount": %d}' % (
+                json.dumps(detail['topic']),
+                'true' if detail['media'] else 'false',
+                len(detail['gallery']),
+            )
+            for detail in topic_entries
+        )
+        _log(f"transition_topics:[{summary}]")
+
+    media_paths: list[str] = []
+    for detail in topic_entries:
+        for media_entry in [detail.get('media')] + list(detail.get('gallery') or []):
+            media_path = _media_file_path(media_entry)
+            if media_path:
+                media_paths.append(media_path)
+    _prefetch_media_dimensions(media_paths)
 
     cues_to_write: list[cue_pb2.Cue] = [base_cue]
     if lower_third_cue is not None:
@@ -883,16 +1124,12 @@ def rebuild_transition_presentation(path: str, label: str, audience_look_name: s
         for cue in topic_cues:
             cues_to_write.append(cue)
         if gallery_payload:
-            try:
-                print(
-                    f"transition_topic_photos:{json.dumps({'topic': topic_text, 'count': len(gallery_payload)})}",
-                    flush=True,
-                )
-            except Exception:
-                print(f"transition_topic_photos:{topic_text}:{len(gallery_payload)}", flush=True)
+            _log('transition_topic_photos:{"topic": %s, "count": %d}' % (json.dumps(topic_text), len(gallery_payload)))
         if idx < len(topic_entries) - 1 or topic_entries:
             cues_to_write.append(build_clear_cue(prop_info))
 
+    # Per-cue add().CopyFrom() measured faster under upb than extend() or a
+    # batch message merged in with MergeFrom, so the loop stays.
     doc.cues.clear()
     for cue in cues_to_write:
         doc.cues.add().CopyFrom(cue)
@@ -904,8 +1141,8 @@ def rebuild_transition_presentation(path: str, label: str, audience_look_name: s
     group.group.name = "Slides"  # Simple generic name
     group.group.application_group_identifier.string = new_uuid()
     group.group.application_group_name = "Slides"
-    for cue in doc.cues:
-        group.cue_identifiers.add().string = cue.uuid.string
+    for cue in cues_to_write:
+        group.cue_identifiers.add(string=cue.uuid.string)
 
     # Ensure there's a default arrangement
     doc.arrangements.clear()
@@ -914,33 +1151,38 @@ def rebuild_transition_presentation(path: str, label: str, audience_look_name: s
     arrangement.name = "Default"
     arrangement.group_identifiers.add().string = group.group.uuid.string
 
-    # Debug log before writing
-    for idx, cue in enumerate(doc.cues):
-        print(f"DEBUG: Cue {idx}: {cue.name} has {len(cue.actions)} actions:", flush=True)
-        for action_idx, action in enumerate(cue.actions):
-            print(f"  Action {action_idx}: type={action.type} name={action.name}", flush=True)
-            if action.type == action_pb2.Action.ActionType.ACTION_TYPE_PROP:
-                print(f"    Prop details: name={action.prop.identification.parameter_name}", flush=True)
+    if notes is not None:
+        doc.notes = notes
+
+    # Debug log before writing; the walk over every cue and action is skipped
+    # entirely unless PP_DEBUG is set.
+    if _DEBUG:
+        for idx, cue in enumerate(doc.cues):
+            _log(f"DEBUG: Cue {idx}: {cue.name} has {len(cue.actions)} actions:")
+            for action_idx, action in enumerate(cue.actions):
+                _log(f"  Action {action_idx}: type={action.type} name={action.name}")
+                if action.type == _PROP:
+                    _log(f"    Prop details: name={action.prop.identification.parameter_name}")
 
     try:
-        write_presentation_bytes(target_file, doc, zip_member, infos, data_map)
-        print(f"DEBUG: Successfully wrote presentation to {target_file}", flush=True)
+        write_presentation_bytes(target_file, doc, zip_member, infos)
+        _debug(f"DEBUG: Successfully wrote presentation to {target_file}")
     except Exception as e:
-        print(f"DEBUG: Error writing presentation: {str(e)}", flush=True)
+        _log(f"DEBUG: Error writing presentation: {str(e)}")
         raise
 
     new_first_cue = doc.cues[0] if doc.cues else None
     new_action = new_first_cue.actions[0] if new_first_cue and new_first_cue.actions else None
-    print(
+    _log(
         "transition_template_after:" \
         f"cues={len(doc.cues)}" \
         f", actions={len(new_first_cue.actions) if new_first_cue else 0}" \
         f", label={new_action.label.text if new_action else ''}" \
-        f", path={path}",
-        flush=True
+        f", path={path}"
     )
 
 
+@_flushes_log
 def main(argv: list[str]) -> int:
     if len(argv) < 2:
         print(
@@ -967,7 +1209,7 @@ def main(argv: list[str]) -> int:
         raw_info = argv[5].strip()
         if raw_info:
             try:
-                parsed_info = json.loads(raw_info)
+                parsed_info = _loads(raw_info)
                 if isinstance(parsed_info, dict):
                     timer_info = parsed_info
             except json.JSONDecodeError:
@@ -977,7 +1219,7 @@ def main(argv: list[str]) -> int:
         raw_stage = argv[6].strip()
         if raw_stage:
             try:
-                parsed_stage = json.loads(raw_stage)
+                parsed_stage = _loads(raw_stage)
                 if isinstance(parsed_stage, dict):
                     stage_layout_info = parsed_stage
             except json.JSONDecodeError:
@@ -987,7 +1229,7 @@ def main(argv: list[str]) -> int:
         raw_topics = argv[7].strip()
         if raw_topics:
             try:
-                parsed_topics = json.loads(raw_topics)
+                parsed_topics = _loads(raw_topics)
                 if isinstance(parsed_topics, list):
                     topic_specs = [entry for entry in parsed_topics if isinstance(entry, dict)]
             except json.JSONDecodeError:
@@ -995,31 +1237,34 @@ def main(argv: list[str]) -> int:
     prop_info: Optional[dict[str, Any]] = None
     if len(argv) > 8:
         raw_prop = argv[8].strip()
-        print(f"DEBUG: Raw prop input: {raw_prop}", flush=True)
+        _debug(f"DEBUG: Raw prop input: {raw_prop}")
         if raw_prop:
             try:
-                parsed_prop = json.loads(raw_prop)
-                print(f"DEBUG: Parsed prop info: {parsed_prop}", flush=True)
+                parsed_prop = _loads(raw_prop)
+                if _DEBUG:
+                    _log(f"DEBUG: Parsed prop info: {parsed_prop}")
                 if isinstance(parsed_prop, dict):
                     prop_info = parsed_prop
-                    print(f"DEBUG: Final prop info: {prop_info}", flush=True)
+                    if _DEBUG:
+                        _log(f"DEBUG: Final prop info: {prop_info}")
             except json.JSONDecodeError as e:
-                print(f"DEBUG: Failed to parse prop info: {str(e)}", flush=True)
+                _debug(f"DEBUG: Failed to parse prop info: {str(e)}")
                 prop_info = None
     lower_third_info: Optional[dict[str, Any]] = None
     if len(argv) > 9:
         raw_lower = argv[9].strip()
         if raw_lower:
             try:
-                parsed_lower = json.loads(raw_lower)
+                parsed_lower = _loads(raw_lower)
                 if isinstance(parsed_lower, dict):
                     lower_third_info = parsed_lower
-                    print(f"DEBUG: Parsed lower third info: {parsed_lower}", flush=True)
+                    if _DEBUG:
+                        _log(f"DEBUG: Parsed lower third info: {parsed_lower}")
             except json.JSONDecodeError:
                 lower_third_info = None
-                print(f"DEBUG: Failed to parse lower third payload: {raw_lower}", flush=True)
+                _debug(f"DEBUG: Failed to parse lower third payload: {raw_lower}")
     else:
-        print("DEBUG: No lower third payload argument provided", flush=True)
+        _debug("DEBUG: No lower third payload argument provided")
     try:
         rebuild_transition_presentation(path, label, look_name, timer_seconds, timer_info, stage_layout_info, topic_specs, prop_info, lower_third_info)
     except Exception as exc:  # pragma: no cover - debugging aid
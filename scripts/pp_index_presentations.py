@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
-import os, sys, json, zipfile
-from pb_runtime_compat import ensure_protobuf_runtime, relax_protobuf_runtime_check
+import os, sys, json, zipfile, itertools
+from concurrent.futures import ProcessPoolExecutor
+try:
+    import orjson  # type: ignore
+except ImportError:  # optional; stdlib json is the fallback
+    orjson = None
+from pb_runtime_compat import ensure_protobuf_runtime, relax_protobuf_runtime_check, warn_if_pure_python_backend
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 GEN_CANDIDATES = [
@@ -20,84 +25,271 @@ def import_presentation_pb2():
         print(json.dumps({"error": "protobuf-runtime-missing", "detail": detail}))
         sys.exit(3)
     relax_protobuf_runtime_check()
+    warn_if_pure_python_backend()
+    try:
+        presentation_pb2, path = _import_presentation_module()
+    except Exception as e2:
+        print(json.dumps({"error": f"failed to import presentation_pb2: {e2}"}))
+        sys.exit(2)
+    print(json.dumps({"info":"import","path":path}))
+    return presentation_pb2
+
+def _import_presentation_module():
     try:
         from rv.data import presentation_pb2
-        print(json.dumps({"info":"import","path":"rv.data.presentation_pb2"}))
-        return presentation_pb2
-    except Exception as e1:
-        try:
-            import presentation_pb2
-            print(json.dumps({"info":"import","path":"presentation_pb2"}))
-            return presentation_pb2
-        except Exception as e2:
-            print(json.dumps({"error": f"failed to import presentation_pb2: {e2}"}))
-            sys.exit(2)
+        return presentation_pb2, "rv.data.presentation_pb2"
+    except Exception:
+        import presentation_pb2
+        return presentation_pb2, "presentation_pb2"
+
+_PRUNE_DIRS = frozenset({'node_modules'})
+
+def _walk(root: str):
+    # DirEntry answers name and type checks from the directory listing, so
+    # no entry is stat'ed. A .pro bundle is yielded without descending into
+    # it, which also keeps its Contents/presentation.pro from being yielded
+    # a second time.
+    try:
+        it = os.scandir(root)
+    except OSError:
+        return
+    with it:
+        for de in it:
+            name = de.name
+            if name.startswith('.'):
+                continue
+            lower = name.lower()
+            try:
+                is_dir = de.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if is_dir:
+                if lower.endswith('.pro'):
+                    yield de.path
+                elif not lower.endswith('.app') and name not in _PRUNE_DIRS:
+                    yield from _walk(de.path)
+            elif lower.endswith('.pro'):
+                yield de.path
 
 def iter_pro_candidates(root: str):
-    for dirpath, dirnames, filenames in os.walk(root):
-        for name in filenames:
-            if name.lower().endswith('.pro'):
-                yield os.path.join(dirpath, name)
-        for name in dirnames:
-            if name.lower().endswith('.pro'):
-                yield os.path.join(dirpath, name)
+    yield from _walk(root)
+
+CHUNK_SIZE = 64
+POOL_MIN_CHUNKS = 4
+OUTPUT_BATCH = 128
+_WORKER_PB = None
+_PROBE_FIELDS = ('uuid', 'id', 'identifier', 'name', 'title')
+_WANTED_NUMBERS: dict = {}
+
+def _read_varint(buf, pos: int):
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(buf):
+            raise ValueError("truncated varint")
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 70:
+            raise ValueError("varint too long")
+
+def _skip(tag: int, buf, pos: int) -> int:
+    wire_type = tag & 7
+    if wire_type == 0:
+        _value, pos = _read_varint(buf, pos)
+    elif wire_type == 1:
+        pos += 8
+    elif wire_type == 2:
+        length, pos = _read_varint(buf, pos)
+        pos += length
+    elif wire_type == 5:
+        pos += 4
+    elif wire_type == 3:
+        end_tag = (tag & ~7) | 4
+        while True:
+            inner, pos = _read_varint(buf, pos)
+            if inner == end_tag:
+                break
+            pos = _skip(inner, buf, pos)
+    else:
+        raise ValueError(f"unexpected wire type {wire_type}")
+    if pos > len(buf):
+        raise ValueError("truncated field")
+    return pos
+
+def _scan_top_scalars(payload: bytes, field_numbers) -> bytes:
+    """Return the top-level fields in field_numbers as wire bytes.
+
+    Walks the payload through a memoryview and steps over every other
+    field by length, so nested cues and slides are never decoded. The
+    wanted fields are sliced out unchanged; the result parses into a
+    sparse message.
+    """
+    buf = memoryview(payload)
+    out = bytearray()
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        start = pos
+        tag, pos = _read_varint(buf, pos)
+        if tag >> 3 == 0:
+            raise ValueError("invalid field number 0")
+        pos = _skip(tag, buf, pos)
+        # The probed fields are all strings or messages (wire type 2).
+        if tag >> 3 in field_numbers and tag & 7 == 2:
+            out += buf[start:pos]
+    return bytes(out)
+
+def _wanted_numbers(pb) -> frozenset:
+    numbers = _WANTED_NUMBERS.get(pb)
+    if numbers is None:
+        fields = pb.Presentation.DESCRIPTOR.fields_by_name
+        numbers = frozenset(fields[name].number for name in _PROBE_FIELDS if name in fields)
+        _WANTED_NUMBERS[pb] = numbers
+    return numbers
+
+def _index_file(pb, p: str):
+    """Return the output record for one candidate, or None if it is skipped."""
+    try:
+        wanted = _wanted_numbers(pb)
+        if os.path.isdir(p):
+            candidate = os.path.join(p, 'Contents', 'presentation.pro')
+            if not os.path.exists(candidate):
+                return None
+            with open(candidate, 'rb') as f:
+                payload = f.read()
+        else:
+            with open(p, 'rb') as f:
+                header = f.read(4)
+                f.seek(0)
+                if header == b'PK\x03\x04':
+                    with zipfile.ZipFile(f, allowZip64=True) as zf:
+                        names = [n for n in zf.namelist() if n.lower().endswith('.pro')]
+                        if not names:
+                            return None
+                        payload = zf.read(names[0])
+                else:
+                    payload = f.read()
+        fields = _scan_top_scalars(payload, wanted)
+        doc = pb.Presentation()
+        doc.ParseFromString(fields)
+        # Probe several candidate fields
+        uuid = (
+            getattr(doc, 'uuid', '')
+            or (getattr(getattr(doc, 'id', None), 'uuid', '') if getattr(doc, 'id', None) else '')
+            or (getattr(getattr(doc, 'id', None), 'id', '') if getattr(doc, 'id', None) else '')
+            or getattr(doc, 'identifier', '')
+            or ''
+        )
+        title = getattr(doc, 'name', '') or getattr(doc, 'title', '') or os.path.basename(p)
+        if uuid:
+            return {"uuid": str(uuid), "title": str(title), "path": p}
+        # Emit a hint line so caller knows parse succeeded but no uuid present
+        return {"warn":"no-uuid", "title": str(title), "path": p}
+    except Exception:
+        # skip unreadable file
+        return None
+
+def _parse_chunk(paths: list[str]) -> list[dict]:
+    # Runs in a worker process; the generated module is imported once per
+    # worker rather than once per chunk.
+    global _WORKER_PB
+    if _WORKER_PB is None:
+        ok, detail = ensure_protobuf_runtime()
+        if not ok:
+            raise RuntimeError(f"protobuf runtime not available: {detail}")
+        relax_protobuf_runtime_check()
+        _WORKER_PB, _path = _import_presentation_module()
+    records = []
+    for p in paths:
+        record = _index_file(_WORKER_PB, p)
+        if record is not None:
+            records.append(record)
+    return records
+
+def _chunks(iterable, size: int):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _dumps(record) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record).encode('utf-8')
 
 def main():
     if len(sys.argv) < 2:
         print("Usage: python scripts/pp_index_presentations.py /path/to/Library", file=sys.stderr)
         sys.exit(1)
     root = os.path.expanduser(sys.argv[1])
-    pb = import_presentation_pb2()
+    global _WORKER_PB
+    _WORKER_PB = import_presentation_pb2()
     pro_count = 0
     found = 0
-    for p in iter_pro_candidates(root):
-        pro_count += 1
-        try:
-            payload: bytes | None = None
-            if os.path.isdir(p):
-                candidate = os.path.join(p, 'Contents', 'presentation.pro')
-                if os.path.exists(candidate):
-                    with open(candidate, 'rb') as f:
-                        payload = f.read()
-                else:
-                    continue
-            else:
-                with open(p, 'rb') as f:
-                    header = f.read(4)
-                    f.seek(0)
-                    if header == b'PK\x03\x04':
-                        with zipfile.ZipFile(f) as zf:
-                            for info in zf.infolist():
-                                if info.filename.lower().endswith('.pro'):
-                                    payload = zf.read(info.filename)
-                                    break
-                        if payload is None:
-                            continue
-                    else:
-                        payload = f.read()
-            if payload is None:
+    # NDJSON lines go out OUTPUT_BATCH at a time in one write each. Anything
+    # already printed as text (the import banner) is flushed first so the
+    # byte writes land after it.
+    sys.stdout.flush()
+    out = sys.stdout.buffer
+    out_buf: list[bytes] = []
+
+    def flush_output():
+        if out_buf:
+            out.write(b'\n'.join(out_buf) + b'\n')
+            out.flush()
+            out_buf.clear()
+
+    def emit(records):
+        nonlocal found
+        for record in records:
+            try:
+                out_buf.append(_dumps(record))
+            except Exception:
+                # skip a record that cannot be serialized, as a failed parse is skipped
                 continue
-            doc = pb.Presentation()
-            doc.ParseFromString(payload)
-            # Probe several candidate fields
-            uuid = (
-                getattr(doc, 'uuid', '')
-                or (getattr(getattr(doc, 'id', None), 'uuid', '') if getattr(doc, 'id', None) else '')
-                or (getattr(getattr(doc, 'id', None), 'id', '') if getattr(doc, 'id', None) else '')
-                or getattr(doc, 'identifier', '')
-                or ''
-            )
-            title = getattr(doc, 'name', '') or getattr(doc, 'title', '') or os.path.basename(p)
-            if uuid:
-                print(json.dumps({"uuid": str(uuid), "title": str(title), "path": p}))
+            if "uuid" in record:
                 found += 1
-            else:
-                # Emit a hint line so caller knows parse succeeded but no uuid present
-                print(json.dumps({"warn":"no-uuid", "title": str(title), "path": p}))
-        except Exception:
-            # skip unreadable file
-            continue
-    print(json.dumps({"info": "scan complete", "count": found, "files": pro_count}))
+            if len(out_buf) >= OUTPUT_BATCH:
+                flush_output()
+
+    chunks = _chunks(iter_pro_candidates(root), CHUNK_SIZE)
+    head = list(itertools.islice(chunks, POOL_MIN_CHUNKS))
+    workers = os.cpu_count() or 1
+    if workers == 1 or len(head) < POOL_MIN_CHUNKS:
+        # Each worker pays for its own protobuf import (about 0.1 s, more
+        # under spawn), which a small library or a single core never wins back.
+        for chunk in itertools.chain(head, chunks):
+            pro_count += len(chunk)
+            emit(_parse_chunk(chunk))
+    else:
+        # Results are collected in submission (walk) order so the output is
+        # deterministic; the consumer keeps the last entry for a repeated uuid.
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            submitted = [
+                (chunk, executor.submit(_parse_chunk, chunk))
+                for chunk in itertools.chain(head, chunks)
+            ]
+            for chunk, future in submitted:
+                try:
+                    records = future.result()
+                except Exception as exc:
+                    # A failed worker (import error, broken pool) would lose
+                    # the whole chunk; scan it in this process instead.
+                    print(
+                        f"warning: index worker failed on {len(chunk)} files ({exc!r}); scanning them in-process",
+                        file=sys.stderr,
+                    )
+                    records = _parse_chunk(chunk)
+                pro_count += len(chunk)
+                emit(records)
+    out_buf.append(_dumps({"info": "scan complete", "count": found, "files": pro_count}))
+    flush_output()
 
 if __name__ == '__main__':
     main()
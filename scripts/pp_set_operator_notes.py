@@ -1,6 +1,7 @@
 import os
 import sys
-from pb_runtime_compat import ensure_protobuf_runtime, relax_protobuf_runtime_check
+from pb_runtime_compat import ensure_protobuf_runtime, relax_protobuf_runtime_check, warn_if_pure_python_backend
+from notes_io import parse_file_into, write_file
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 GEN_CANDIDATES = [
@@ -17,6 +18,7 @@ if not ok:
     raise SystemExit(f"protobuf runtime not available: {detail}")
 
 relax_protobuf_runtime_check()
+warn_if_pure_python_backend()
 
 try:
     from rv.data import presentation_pb2  # generated from presentation.proto
@@ -31,13 +33,11 @@ path = sys.argv[1]
 new_notes = " ".join(sys.argv[2:])
 
 doc = presentation_pb2.Presentation()
-with open(path, "rb") as f:
-    doc.ParseFromString(f.read())
+parse_file_into(doc, path)
 
 print("Current operator notes:", repr(doc.notes))
 doc.notes = new_notes
 
-with open(path, "wb") as f:
-    f.write(doc.SerializeToString())
+write_file(path, doc.SerializeToString())
 
 print("✅ Wrote operator notes to:", path)
@@ -1,7 +1,6 @@
 import argparse
 import os
 import sys
-from google.protobuf.message import DecodeError
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..'))
@@ -13,18 +12,18 @@ if SCRIPT_DIR not in sys.path:
 gen_dir = os.path.join(PROJECT_ROOT, 'src', 'gen')
 sys.path.insert(0, os.path.abspath(gen_dir))
 
-from pb_runtime_compat import ensure_protobuf_runtime, relax_protobuf_runtime_check
+from pb_runtime_compat import ensure_protobuf_runtime, relax_protobuf_runtime_check, warn_if_pure_python_backend
+from notes_io import parse_file_into, write_file
 
-try:
-    from pp_apply_transition_template import (
-        rebuild_transition_presentation,
-        LABEL_DEFAULT as TRANSITION_LABEL,
-        AUDIENCE_LOOK_DEFAULT as TRANSITION_LOOK,
-    )
-except ImportError:  # pragma: no cover - helper script missing
-    rebuild_transition_presentation = None  # type: ignore
-    TRANSITION_LABEL = "Background & Lights"
-    TRANSITION_LOOK = "Full Screen Media"
+def load_transition_helper():
+    # The template module pulls in every generated cue/slide/action module,
+    # so notes-only runs never import it. Returns the module, or None when
+    # the helper script is missing.
+    try:
+        import pp_apply_transition_template
+    except ImportError:  # pragma: no cover - helper script missing
+        return None
+    return pp_apply_transition_template
 
 
 def parse_args(argv: list[str]) -> argparse.Namespace:
@@ -55,15 +54,15 @@ def main(argv: list[str]) -> int:
         raise SystemExit(f"protobuf runtime not available: {detail}")
 
     relax_protobuf_runtime_check()
+    warn_if_pure_python_backend()
 
+    # Imported only after ensure_protobuf_runtime has picked the backend.
+    from google.protobuf.message import DecodeError
     import presentation_pb2  # generated from presentation.proto
 
     doc = presentation_pb2.Presentation()
-    with open(pro_file, "rb") as f:
-        data = f.read()
-
     try:
-        doc.ParseFromString(data)
+        parse_file_into(doc, pro_file)
     except DecodeError:
         print(
             "ERROR: Could not parse the .pro file. Is this a Presentation document? Is ProPresenter closed?",
@@ -72,27 +71,47 @@ def main(argv: list[str]) -> int:
         raise
 
     print("Current operator notes:", repr(doc.notes))
-    doc.notes = notes  # overwrite; append mode can be enabled later
-
-    with open(pro_file, "wb") as f:
-        f.write(doc.SerializeToString())
-
-    print("✅ Wrote operator notes to:", pro_file)
-    print("New operator notes:", repr(notes))
 
+    # For transitions the rebuild writes the notes along with the template, so
+    # the file is only written once. The plain write below is the fallback.
+    rebuilt = False
     designation = (args.designation or '').strip().lower() if args.designation else ''
     if designation == 'transition':
-        if rebuild_transition_presentation is None:
+        transition = load_transition_helper()
+        if transition is None:
             print(
                 "⚠️ Transition designation set but transition template helper is unavailable.",
                 file=sys.stderr,
             )
         else:
             try:
-                rebuild_transition_presentation(pro_file, TRANSITION_LABEL, TRANSITION_LOOK)
-                print("✅ Transition presentation rebuilt with template:", TRANSITION_LABEL)
+                transition.rebuild_transition_presentation(
+                    pro_file,
+                    transition.LABEL_DEFAULT,
+                    transition.AUDIENCE_LOOK_DEFAULT,
+                    None,
+                    None,
+                    None,
+                    None,
+                    None,
+                    None,
+                    doc=doc,
+                    notes=notes,
+                )
+                rebuilt = True
+                print("✅ Transition presentation rebuilt with template:", transition.LABEL_DEFAULT)
             except Exception as exc:  # pragma: no cover - runtime safety
                 print(f"⚠️ Failed to rebuild transition presentation: {exc}", file=sys.stderr)
+                # Drop whatever the failed rebuild left behind in doc.
+                doc = presentation_pb2.Presentation()
+                parse_file_into(doc, pro_file)
+
+    if not rebuilt:
+        doc.notes = notes  # overwrite; append mode can be enabled later
+        write_file(pro_file, doc.SerializeToString())
+
+    print("✅ Wrote operator notes to:", pro_file)
+    print("New operator notes:", repr(notes))
 
     return 0
 